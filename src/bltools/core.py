@@ -1,45 +1,103 @@
 import asyncio
+import itertools
+import os
+import random
+import re
+import shutil
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 from io import BytesIO
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, TypeVar
 
+import aiofiles
 import httpx
+import numpy as np
 import structlog
-import xmltodict
 from PIL import Image
 from rich.console import Console
 from rich.progress import BarColumn, Progress, SpinnerColumn, TaskID, TextColumn
-from tenacity import (
-    retry,
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_exponential,
-)
 
 from bltools.models import IIIFCanvas, IIIFManifest
-from bltools.settings import Settings
+from bltools.settings import OutputFormat, Settings
+
+try:
+    import pyvips
+except (ImportError, OSError):  # pragma: no cover - optional dependency
+    pyvips = None
+
+try:
+    import simplejpeg
+except ImportError:  # pragma: no cover - optional dependency
+    simplejpeg = None
 
 logger = structlog.get_logger()
 
+T = TypeVar("T")
+
+MAX_ATTEMPTS = 5
+
+# Encoder options for stitched pages, pinned rather than left to Pillow defaults:
+# 4:2:0 chroma subsampling, baseline rather than progressive, and no extra
+# Huffman optimisation pass keep the encode of very large pages fast.
+JPEG_SAVE_OPTIONS: dict[str, Any] = {
+    "quality": 92,
+    "subsampling": 2,
+    "optimize": False,
+    "progressive": False,
+}
+
+# Deep Zoom descriptors are tiny and fixed in shape, so the three attributes we
+# need are read straight from the raw bytes rather than through an XML tree.
+_TILE_SIZE_RE = re.compile(rb'\bTileSize="(\d+)"')
+_WIDTH_RE = re.compile(rb'\bWidth="(\d+)"')
+_HEIGHT_RE = re.compile(rb'\bHeight="(\d+)"')
+
+
+@asynccontextmanager
+async def _limited(sem: Optional[asyncio.Semaphore]) -> AsyncIterator[None]:
+    """Hold ``sem`` for the duration of the block, if one is given."""
+    if sem is None:
+        yield
+        return
+    async with sem:
+        yield
+
 
-async def fetch_manifest(url: str) -> IIIFManifest:
+async def fetch_manifest(
+    url: str,
+    client: Optional[httpx.AsyncClient] = None,
+    sem: Optional[asyncio.Semaphore] = None,
+) -> IIIFManifest:
     """
     Fetch and parse a IIIF manifest from a URL.
 
     Args:
         url: The URL of the IIIF manifest.
+        client: HTTP client to reuse, so the manifest request warms the same
+            connection pool as the image downloads. A short-lived one is used if
+            omitted.
+        sem: Semaphore capping in-flight requests across the whole download.
 
     Returns:
         IIIFManifest: The parsed manifest object.
     """
-    async with httpx.AsyncClient(follow_redirects=True) as client:
+    if client is None:
+        async with httpx.AsyncClient(follow_redirects=True) as own_client:
+            return await fetch_manifest(url, own_client, sem)
+
+    async with _limited(sem):
         res = await client.get(url)
-        res.raise_for_status()
-        return IIIFManifest.model_validate(res.json())
+    res.raise_for_status()
+    return IIIFManifest.model_validate_json(res.content)
 
 
 async def get_file_info(
-    client: httpx.AsyncClient, manuscript_id: str, filename: str, settings: Settings
+    client: httpx.AsyncClient,
+    manuscript_id: str,
+    filename: str,
+    settings: Settings,
+    sem: Optional[asyncio.Semaphore] = None,
 ) -> tuple[int, int, int]:
     """
     Fetch the XML metadata for a page to determine dimensions and tile size.
@@ -49,6 +107,7 @@ async def get_file_info(
         manuscript_id: The ID of the manuscript.
         filename: The specific filename (e.g., f001r.jpg).
         settings: Application settings.
+        sem: Semaphore capping in-flight requests across the whole download.
 
     Returns:
         tuple[int, int, int]: Width, height, and tile size.
@@ -60,14 +119,19 @@ async def get_file_info(
     log = logger.bind(manuscript_id=manuscript_id, filename=filename, url=info_url)
 
     log.debug("fetching_metadata")
-    response = await client.get(info_url)
+    async with _limited(sem):
+        response = await client.get(info_url)
     response.raise_for_status()
 
     try:
-        info_dict = xmltodict.parse(response.content)
-        w = int(info_dict["Image"]["Size"]["@Width"]) - 1
-        h = int(info_dict["Image"]["Size"]["@Height"]) - 1
-        t = int(info_dict["Image"]["@TileSize"])
+        width = _WIDTH_RE.search(response.content)
+        height = _HEIGHT_RE.search(response.content)
+        tile_size = _TILE_SIZE_RE.search(response.content)
+        if width is None or height is None or tile_size is None:
+            raise ValueError("missing Width, Height or TileSize attribute")
+        w = int(width[1]) - 1
+        h = int(height[1]) - 1
+        t = int(tile_size[1])
         log.debug("metadata_parsed", width=w, height=h, tile_size=t)
         return w, h, t
     except (KeyError, ValueError, Exception) as e:
@@ -75,74 +139,442 @@ async def get_file_info(
         raise ValueError(f"Failed to parse XML for {filename}: {e}") from e
 
 
-@retry(
-    stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=1, min=1, max=10),
-    retry=retry_if_exception_type((httpx.RequestError, httpx.HTTPStatusError)),
-)
-async def download_image(client: httpx.AsyncClient, url: str) -> bytes:
+async def _with_retries(fetch: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run a request with jittered exponential backoff on transient HTTP errors.
+
+    A plain loop rather than a retry framework: almost every call succeeds first
+    time, so the happy path should cost no more than the request itself. Callers
+    take their concurrency slot inside ``fetch``, so backoff sleeps never hold one.
+    The random jitter keeps tiles that failed together from retrying in lockstep.
+
+    Args:
+        fetch: Coroutine function performing one attempt.
+
+    Returns:
+        T: The result of the first successful attempt.
+    """
+    for attempt in range(MAX_ATTEMPTS - 1):
+        try:
+            return await fetch()
+        except (httpx.RequestError, httpx.HTTPStatusError):
+            # Backoff jitter only; this randomness has no security role.
+            jitter = random.uniform(0.5, 1.5)  # nosec B311
+            await asyncio.sleep(min(30, 0.5 * 2**attempt) * jitter)
+    return await fetch()
+
+
+async def download_image(
+    client: httpx.AsyncClient, url: str, sem: Optional[asyncio.Semaphore] = None
+) -> bytes:
     """
     Download an image with exponential backoff retries.
 
     Args:
         client: The HTTP client to use.
         url: URL of the image.
+        sem: Semaphore capping in-flight requests, held for each attempt.
 
     Returns:
         bytes: The image content.
     """
-    response = await client.get(url)
-    response.raise_for_status()
-    return response.content
 
+    async def fetch() -> bytes:
+        async with _limited(sem):
+            response = await client.get(url)
+        response.raise_for_status()
+        return response.content
 
-async def process_iiif_canvas(
+    return await _with_retries(fetch)
+
+
+async def download_image_to_file(
     client: httpx.AsyncClient,
-    canvas: IIIFCanvas,
-    index: int,
-    settings: Settings,
+    url: str,
+    file_path: Path,
+    sem: Optional[asyncio.Semaphore] = None,
+) -> None:
+    """
+    Stream an image straight to disk with exponential backoff retries.
+
+    The body is written to a ``.part`` file that is only renamed into place once
+    complete, so an interrupted download is never mistaken for a finished one.
+
+    Args:
+        client: The HTTP client to use.
+        url: URL of the image.
+        file_path: Destination path of the image.
+        sem: Semaphore capping in-flight requests, held for each attempt.
+    """
+    part_path = file_path.with_name(f"{file_path.name}.part")
+
+    async def fetch() -> None:
+        try:
+            async with _limited(sem), client.stream("GET", url) as response:
+                response.raise_for_status()
+                async with aiofiles.open(part_path, "wb") as f:
+                    async for chunk in response.aiter_bytes(1 << 16):
+                        await f.write(chunk)
+            part_path.replace(file_path)
+        except BaseException:
+            part_path.unlink(missing_ok=True)
+            raise
+
+    await _with_retries(fetch)
+
+
+def _decode_tile(content: bytes) -> np.ndarray:
+    """
+    Decode a JPEG tile to an RGB array.
+
+    Uses libjpeg-turbo through simplejpeg when it is installed, falling back to
+    Pillow if it is not or if it rejects the tile.
+
+    Args:
+        content: The encoded tile.
+
+    Returns:
+        np.ndarray: The tile pixels, of shape (height, width, 3).
+    """
+    if simplejpeg is not None:
+        try:
+            pixels: np.ndarray = simplejpeg.decode_jpeg(content, colorspace="RGB")
+            return pixels
+        except ValueError:
+            pass
+    with Image.open(BytesIO(content), formats=("JPEG",)) as image:
+        # Ask libjpeg to decode straight to RGB; BL tiles almost always are.
+        image.draft("RGB", image.size)
+        rgb = image if image.mode == "RGB" else image.convert("RGB")
+        return np.asarray(rgb)
+
+
+def _paste_tile(canvas: np.ndarray, content: bytes, x: int, y: int) -> None:
+    """
+    Decode a JPEG tile and copy it into the page canvas at ``(x, y)``.
+
+    Args:
+        canvas: The page canvas, an RGB array of shape (height, width, 3).
+        content: The encoded tile.
+        x: Left offset of the tile on the page.
+        y: Top offset of the tile on the page.
+    """
+    tile = _decode_tile(content)
+    # Edge tiles may overhang the page; clip them like Image.paste did.
+    tile = tile[: canvas.shape[0] - y, : canvas.shape[1] - x]
+    canvas[y : y + tile.shape[0], x : x + tile.shape[1]] = tile
+
+
+def _stitch_vips(
+    tiles: dict[tuple[int, int], bytes],
+    columns_count: int,
+    rows_count: int,
+    width: int,
+    height: int,
+    file_path: Path,
+) -> None:
+    """
+    Stitch and save a page with libvips instead of a Pillow canvas.
+
+    libvips decodes, joins and encodes the tiles as one streaming pipeline, so the
+    full decoded page never has to be held in memory.
+
+    Args:
+        tiles: Encoded tiles keyed by (column, row).
+        columns_count: Number of tile columns.
+        rows_count: Number of tile rows.
+        width: Page width.
+        height: Page height.
+        file_path: Destination path of the page.
+    """
+    images = [
+        pyvips.Image.new_from_buffer(tiles[col, row], "", access="sequential")
+        for row in range(rows_count)
+        for col in range(columns_count)
+    ]
+    page = pyvips.Image.arrayjoin(images, across=columns_count)
+    # Crop overhanging edge tiles (or pad short ones) to the page size.
+    page.embed(0, 0, width, height).jpegsave(
+        str(file_path), Q=92, optimize_coding=True, strip=True
+    )
+
+
+def _cache_tile(cache_path: Path, content: bytes) -> None:
+    """
+    Store a downloaded tile in the page's tile cache.
+
+    The tile is written under a temporary name and renamed into place, so an
+    interrupted write never leaves a truncated tile to be reused.
+
+    Args:
+        cache_path: Path of the cached tile.
+        content: The encoded tile.
+    """
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    part_path = cache_path.with_name(f"{cache_path.name}.part")
+    part_path.write_bytes(content)
+    part_path.replace(cache_path)
+
+
+def _clear_tile_cache(tile_cache: Path) -> None:
+    """
+    Delete a page's tile cache, and the shared cache directory once it is empty.
+
+    Args:
+        tile_cache: The page's tile cache directory.
+    """
+    shutil.rmtree(tile_cache, ignore_errors=True)
+    try:
+        tile_cache.parent.rmdir()
+    except OSError:
+        pass  # Other pages still have cached tiles.
+
+
+def _promote_tile_cache(
+    tile_cache: Path, page_dir: Path, tiles: dict[tuple[int, int], bytes]
+) -> None:
+    """
+    Save a page as its raw tiles, named ``{column}_{row}.jpg``, without stitching.
+
+    The tiles of a complete page are normally all in its tile cache already, so
+    the cache is renamed into place rather than writing the tiles a second time.
+    Any tile whose cache write failed is written now. The rename is atomic, so an
+    interrupted page is never mistaken for a finished one.
+
+    Args:
+        tile_cache: The page's tile cache directory.
+        page_dir: Destination directory of the page.
+        tiles: Every tile of the page keyed by (column, row): empty bytes for a
+            tile already in the cache, its encoded bytes otherwise.
+    """
+    for (col, row), content in tiles.items():
+        if content:
+            _cache_tile(tile_cache / f"{col}_{row}.jpg", content)
+    for leftover in tile_cache.glob("*.part"):
+        leftover.unlink()
+    tile_cache.replace(page_dir)
+
+
+def _write_page(
+    file_path: Path,
+    canvas: Optional[np.ndarray],
+    tiles: dict[tuple[int, int], bytes],
+    columns_count: int,
+    rows_count: int,
+    width: int,
+    height: int,
+) -> None:
+    """
+    Write a fully downloaded legacy page as a stitched JPEG.
+
+    The page is written under a temporary name and renamed into place, so a
+    save that fails partway never leaves a file that looks like a saved page.
+
+    Args:
+        file_path: Destination of the page.
+        canvas: The stitched page, or None if its tiles were kept encoded.
+        tiles: Encoded tiles keyed by (column, row), used when there's no canvas.
+        columns_count: Number of tile columns.
+        rows_count: Number of tile rows.
+        width: Page width.
+        height: Page height.
+    """
+    part_path = file_path.with_name(f"{file_path.name}.part")
+    try:
+        if canvas is None:
+            _stitch_vips(tiles, columns_count, rows_count, width, height, part_path)
+        else:
+            Image.fromarray(canvas).save(part_path, "JPEG", **JPEG_SAVE_OPTIONS)
+        part_path.replace(file_path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+
+async def _collect_tiles(
+    tasks: set[asyncio.Task[tuple[int, int, bytes]]],
+    canvas: Optional[np.ndarray],
+    tile_size: int,
+) -> dict[tuple[int, int], bytes]:
+    """
+    Drain a page's tile downloads as they complete.
+
+    With a canvas, each tile is decoded and pasted in a worker thread as soon as
+    it arrives, so decoding overlaps with the downloads still in flight. Without
+    one, tiles are kept encoded for the caller to write out.
+
+    A page with a missing tile is never saved, so the first failure cancels the
+    page's remaining downloads and is re-raised, like an ``asyncio.TaskGroup``.
+
+    Handled tasks are removed from ``tasks`` straight away, so neither this
+    function nor the caller keeps every tile's bytes alive until the page is done.
+
+    Args:
+        tasks: The page's tile downloads, each resolving to (column, row, bytes).
+        canvas: Page canvas to paste into, or None to keep tiles encoded.
+        tile_size: Tile edge length in pixels.
+
+    Returns:
+        dict[tuple[int, int], bytes]: Encoded tiles keyed by (column, row), empty
+            when pasting into a canvas.
+
+    Raises:
+        Exception: The first error raised by a tile download or decode.
+    """
+    tiles: dict[tuple[int, int], bytes] = {}
+    done: set[asyncio.Task[tuple[int, int, bytes]]] = set()
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            tasks -= done
+            for task in done:
+                col, row, content = task.result()
+                if canvas is None:
+                    tiles[col, row] = content
+                else:
+                    await asyncio.to_thread(
+                        _paste_tile, canvas, content, col * tile_size, row * tile_size
+                    )
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Gathering the last batch too retrieves the errors of any tiles that
+        # failed alongside the one re-raised, which asyncio would otherwise log.
+        await asyncio.gather(*tasks, *done, return_exceptions=True)
+    return tiles
+
+
+async def _save_page(
+    tasks: set[asyncio.Task[tuple[int, int, bytes]]],
+    canvas: Optional[np.ndarray],
+    tile_size: int,
+    tile_cache: Path,
+    file_path: Path,
+    columns_count: int,
+    rows_count: int,
+    width: int,
+    height: int,
+    as_tiles: bool,
+) -> None:
+    """
+    Collect a legacy page's tiles, save the page and clear its tile cache.
+
+    Tiles that failed to download were never cached, but one that downloaded and
+    then failed to decode was. So any failure other than a network error drops
+    the page's whole cache before re-raising, and the next run starts afresh.
+
+    Args:
+        tasks: The page's tile downloads, each resolving to (column, row, bytes).
+        canvas: Page canvas to paste into, or None to keep tiles encoded.
+        tile_size: Tile edge length in pixels.
+        tile_cache: The page's tile cache directory.
+        file_path: Destination of the page, a directory when saving tiles.
+        columns_count: Number of tile columns.
+        rows_count: Number of tile rows.
+        width: Page width.
+        height: Page height.
+        as_tiles: Save the raw tiles instead of a stitched JPEG.
+
+    Raises:
+        Exception: The first error raised while downloading, decoding or saving.
+    """
+    try:
+        tiles = await _collect_tiles(tasks, canvas, tile_size)
+        if as_tiles:
+            await asyncio.to_thread(_promote_tile_cache, tile_cache, file_path, tiles)
+        else:
+            # libvips only decodes the tiles here, so a bad one can surface now.
+            await asyncio.to_thread(
+                _write_page,
+                file_path,
+                canvas,
+                tiles,
+                columns_count,
+                rows_count,
+                width,
+                height,
+            )
+    except Exception as e:
+        if not isinstance(e, (httpx.RequestError, httpx.HTTPStatusError)):
+            await asyncio.to_thread(_clear_tile_cache, tile_cache)
+        raise
+    await asyncio.to_thread(_clear_tile_cache, tile_cache)
+
+
+def _already_saved(file_path: Path, existing: Optional[set[str]]) -> bool:
+    """
+    Check whether a page was saved by an earlier run.
+
+    Args:
+        file_path: Output path of the page.
+        existing: Names listed in the output directory at the start of the run,
+            or None to stat the path instead.
+
+    Returns:
+        bool: True if the page is already on disk.
+    """
+    if existing is None:
+        return file_path.exists()
+    return file_path.name in existing
+
+
+def _canvas_filename(canvas: IIIFCanvas, index: int) -> str:
+    """
+    Build the output filename for a IIIF canvas.
+
+    Args:
+        canvas: The IIIF canvas object.
+        index: The page index.
+
+    Returns:
+        str: The filename, e.g. ``0001_Page_1.jpg``.
+    """
+    return f"{index:04d}_{canvas.filename_label or index}.jpg"
+
+
+async def download_canvas(
+    client: httpx.AsyncClient,
+    filename: str,
+    url: str,
     target_dir: Path,
     progress: Progress,
     task_id: TaskID,
+    sem: Optional[asyncio.Semaphore] = None,
+    existing: Optional[set[str]] = None,
 ) -> None:
     """
-    Download a single IIIF canvas (page).
+    Download a IIIF canvas image whose filename and URL are already resolved.
 
     Args:
         client: The HTTP client to use.
-        canvas: The IIIF canvas object.
-        index: The page index.
-        settings: Application settings.
+        filename: Output filename of the page.
+        url: Image URL, or an empty string if the canvas has none.
         target_dir: Directory to save the image.
         progress: Progress bar object.
         task_id: Progress task ID.
+        sem: Semaphore capping in-flight requests across the whole download.
+        existing: Names already in ``target_dir``, to skip saved pages without a
+            stat per page. Saved pages are added to it.
     """
-    label = (
-        canvas.label
-        if isinstance(canvas.label, str)
-        else canvas.label.get("en", [str(index)])[0]
-    )
-    filename = f"{index:04d}_{label.replace(' ', '_')}.jpg"
     file_path = target_dir / filename
-    log = logger.bind(canvas_id=canvas.id, filename=filename)
+    log = logger.bind(filename=filename, url=url)
 
-    if file_path.exists():
+    if _already_saved(file_path, existing):
         progress.update(
             task_id, advance=1, description=f"[dim]Skipped {filename}[/dim]"
         )
         log.info("canvas_skipped_exists")
         return
 
-    url = canvas.get_image_url()
     if not url:
         log.error("no_image_url_found")
         progress.update(task_id, advance=1)
         return
 
     try:
-        content = await download_image(client, url)
-        with open(file_path, "wb") as f:
-            f.write(content)
+        await download_image_to_file(client, url, file_path, sem)
+        if existing is not None:
+            existing.add(filename)
         log.info("canvas_downloaded_success")
     except Exception as e:
         log.error("canvas_download_failed", error=str(e))
@@ -153,6 +585,47 @@ async def process_iiif_canvas(
     )
 
 
+async def process_iiif_canvas(
+    client: httpx.AsyncClient,
+    canvas: IIIFCanvas,
+    index: int,
+    settings: Settings,
+    target_dir: Path,
+    progress: Progress,
+    task_id: TaskID,
+    sem: Optional[asyncio.Semaphore] = None,
+    existing: Optional[set[str]] = None,
+) -> None:
+    """
+    Download a single IIIF canvas (page).
+
+    Kept for callers of the public API; ``download_manuscript`` computes each
+    filename and URL up front and calls ``download_canvas`` directly.
+
+    Args:
+        client: The HTTP client to use.
+        canvas: The IIIF canvas object.
+        index: The page index.
+        settings: Ignored; accepted only so existing callers keep working.
+        target_dir: Directory to save the image.
+        progress: Progress bar object.
+        task_id: Progress task ID.
+        sem: Semaphore capping in-flight requests across the whole download.
+        existing: Names already in ``target_dir``, to skip saved pages without a
+            stat per page. Saved pages are added to it.
+    """
+    await download_canvas(
+        client,
+        _canvas_filename(canvas, index),
+        canvas.get_image_url(),
+        target_dir,
+        progress,
+        task_id,
+        sem,
+        existing,
+    )
+
+
 async def process_legacy_page(
     client: httpx.AsyncClient,
     manuscript_id: str,
@@ -162,10 +635,15 @@ async def process_legacy_page(
     target_dir: Path,
     progress: Progress,
     task_id: TaskID,
+    sem: Optional[asyncio.Semaphore] = None,
+    existing: Optional[set[str]] = None,
 ) -> None:
     """
     Process and stitch a legacy Deep Zoom page.
 
+    With ``settings.output_format`` set to tiles, the page is saved as a directory
+    of its raw tiles instead, skipping the decode and re-encode entirely.
+
     Args:
         client: The HTTP client to use.
         manuscript_id: The ID of the manuscript.
@@ -175,69 +653,167 @@ async def process_legacy_page(
         target_dir: Directory to save the image.
         progress: Progress bar object.
         task_id: Progress task ID.
+        sem: Semaphore capping in-flight requests across the whole download.
+            A private one sized by ``settings.max_concurrency`` is used if omitted.
+        existing: Names already in ``target_dir``, to skip saved pages without a
+            stat per page. Saved pages are added to it.
     """
-    filename = f"f{page_num:03d}{side}.jpg"
-    file_path = target_dir / filename
+    stem = f"f{page_num:03d}{side}"
+    filename = f"{stem}.jpg"
+    as_tiles = settings.output_format == OutputFormat.TILES
+    file_path = target_dir / (stem if as_tiles else filename)
     log = logger.bind(manuscript_id=manuscript_id, filename=filename)
 
-    if file_path.exists():
+    if _already_saved(file_path, existing):
         progress.update(
             task_id, advance=1, description=f"[dim]Skipped {filename}[/dim]"
         )
         log.info("page_skipped_exists")
         return
 
+    zoom_level = 13
+    tile_prefix = f"{settings.baseurl}{manuscript_id}_{stem}_files/{zoom_level}/"
+    if sem is None:
+        sem = asyncio.Semaphore(settings.max_concurrency)
+
+    # Tiles are cached on disk until the page is saved, so a page that failed on
+    # one tile only has to fetch that tile again on the next run.
+    tile_cache = target_dir / ".cache" / stem
+    cached = set(os.listdir(tile_cache)) if tile_cache.is_dir() else set()
+
+    async def get_tile(u: str, col: int, row: int) -> tuple[int, int, bytes]:
+        """
+        Fetch a single tile, from the tile cache if it is there.
+
+        When saving raw tiles, a tile that is in the cache is returned as empty
+        bytes: the cache becomes the page, so its bytes are never needed here.
+        """
+        cache_path = tile_cache / f"{col}_{row}.jpg"
+        if cache_path.name in cached:
+            if as_tiles:
+                return col, row, b""
+            return col, row, await asyncio.to_thread(cache_path.read_bytes)
+        content = await download_image(client, u, sem)
+        try:
+            await asyncio.to_thread(_cache_tile, cache_path, content)
+        except OSError as e:
+            # The cache only saves refetching on a rerun; the tile itself is fine.
+            log.debug("tile_cache_write_failed", path=str(cache_path), error=str(e))
+            return col, row, content
+        return col, row, b"" if as_tiles else content
+
+    # Every page has a (0, 0) tile, so fetch it while the metadata request is
+    # in flight instead of waiting a full round trip before the first tile.
+    first_tile = asyncio.ensure_future(get_tile(f"{tile_prefix}0_0.jpg", 0, 0))
     try:
         width, height, tile_size = await get_file_info(
-            client, manuscript_id, filename, settings
+            client, manuscript_id, filename, settings, sem
         )
     except Exception as e:
+        first_tile.cancel()
+        await asyncio.gather(first_tile, return_exceptions=True)
         progress.console.print(f"[red]Error fetching info for {filename}: {e}[/red]")
         progress.update(task_id, advance=1)
         return
 
     columns_count = (width // tile_size) + 1
     rows_count = (height // tile_size) + 1
-    zoom_level = 13
-    tile_url_template = f"{settings.baseurl}{manuscript_id}_{filename.split('.')[0]}_files/{zoom_level}/{{}}_{{}}.jpg"
-
-    page_image = Image.new("RGB", (width, height))
-    sem = asyncio.Semaphore(5)
-
-    async def get_tile(u: str, col: int, row: int) -> tuple[int, int, bytes]:
-        """Fetch a single tile."""
-        async with sem:
-            return col, row, await download_image(client, u)
-
-    tasks = [
-        get_tile(tile_url_template.format(c, r), c, r)
-        for c in range(columns_count)
-        for r in range(rows_count)
-    ]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
 
-    failed_tiles = 0
-    for res in results:
-        if isinstance(res, BaseException):
-            failed_tiles += 1
-            continue
+    use_vips = settings.stitcher == "vips" and pyvips is not None
+    if settings.stitcher == "vips" and not use_vips:
+        log.debug("vips_unavailable_using_pillow")
+    canvas = (
+        None if as_tiles or use_vips else np.empty((height, width, 3), dtype=np.uint8)
+    )
 
-        # res is now guaranteed to be tuple[int, int, bytes]
-        col, row, content = res
-        tile = Image.open(BytesIO(content))
-        page_image.paste(tile, (col * tile_size, row * tile_size))
+    coords = itertools.product(range(columns_count), range(rows_count))
+    tasks = {first_tile} | {
+        asyncio.ensure_future(get_tile(f"{tile_prefix}{c}_{r}.jpg", c, r))
+        for c, r in coords
+        if c or r
+    }
+    try:
+        await _save_page(
+            tasks,
+            canvas,
+            tile_size,
+            tile_cache,
+            file_path,
+            columns_count,
+            rows_count,
+            width,
+            height,
+            as_tiles,
+        )
+    except Exception as e:
+        # Leave the page missing so the next run retries it.
+        log.warning("page_skipped_failed_tiles", error=str(e))
+        progress.console.print(f"[red]Skipped {filename}: a tile failed: {e}[/red]")
+        progress.update(task_id, advance=1)
+        return
 
-    if failed_tiles == 0:
-        page_image.save(file_path)
-        log.info("page_downloaded_success")
-    else:
-        log.warning("page_downloaded_with_errors", failed_tiles=failed_tiles)
+    if existing is not None:
+        existing.add(file_path.name)
+    log.info("page_downloaded_success")
 
     progress.update(
         task_id, advance=1, description=f"[green]Downloaded {filename}[/green]"
     )
 
 
+async def _warm_up(client: httpx.AsyncClient, url: str) -> None:
+    """
+    Open a pooled connection to the tile host before the first page starts.
+
+    DNS, TCP and TLS setup then happen once up front instead of on the first tile
+    of every page racing to connect. Failures are harmless and ignored.
+
+    Args:
+        client: The HTTP client to warm up.
+        url: Any URL on the tile host.
+    """
+    try:
+        await client.head(url, timeout=5.0)
+    except Exception as e:
+        logger.debug("connection_warm_up_failed", url=url, error=str(e))
+
+
+def _parse_range(range_str: str) -> tuple[int, int]:
+    """
+    Parse a page range of the form ``start-end``.
+
+    Args:
+        range_str: The range string (e.g., 1-10).
+
+    Returns:
+        tuple[int, int]: The first and last page, inclusive.
+
+    Raises:
+        ValueError: If the range is malformed.
+    """
+    try:
+        start, end = map(int, range_str.split("-"))
+    except ValueError:
+        logger.error("invalid_range_format", range=range_str)
+        raise ValueError(
+            f"Invalid range format: {range_str}. Use start-end (e.g., 1-10)"
+        ) from None
+    return start, end
+
+
+def _make_progress(console: Console) -> Progress:
+    """Create the progress bar shared by every page of a download."""
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+        console=console,
+        transient=True,
+        refresh_per_second=4,
+    )
+
+
 async def download_manuscript(
     input_str: str,
     settings: Settings,
@@ -257,92 +833,101 @@ async def download_manuscript(
     log = logger.bind(input=input_str)
 
     async with httpx.AsyncClient(
-        headers={"User-Agent": "Mozilla/5.0"}, timeout=60.0, follow_redirects=True
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=64, max_keepalive_connections=32, keepalive_expiry=60
+        ),
+        headers={"User-Agent": "Mozilla/5.0"},
+        timeout=httpx.Timeout(30.0, connect=10.0),
+        follow_redirects=True,
     ) as client:
+        # One budget for every request of the download, whatever the mode.
+        request_sem = asyncio.Semaphore(settings.max_concurrency)
         if is_url:
             log.info("iiif_mode_detected")
-            manifest = await fetch_manifest(input_str)
+            manifest = await fetch_manifest(input_str, client, request_sem)
             # Use manuscript ID from manifest or URL if possible
             folder_name = input_str.split("/")[-1] or "download"
             target_dir = settings.basedir / folder_name
             target_dir.mkdir(parents=True, exist_ok=True)
+            existing = set(os.listdir(target_dir))
 
             items = manifest.items
+            start = 1
             if range_str:
-                try:
-                    start, end = map(int, range_str.split("-"))
-                    items = items[start - 1 : end]
-                except (ValueError, IndexError):
-                    log.error("invalid_range_format", range=range_str)
-                    raise ValueError(
-                        f"Invalid range format: {range_str}. Use start-end (e.g., 1-10)"
-                    ) from None
-
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                BarColumn(),
-                TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                console=console,
-            ) as progress:
+                start, end = _parse_range(range_str)
+                items = items[start - 1 : end]
+
+            # Resolve filenames and URLs up front so the tasks only do I/O, and
+            # drop pages saved by an earlier run before scheduling anything.
+            jobs = [
+                (_canvas_filename(canvas, i), canvas.get_image_url())
+                for i, canvas in enumerate(items, start=start)
+            ]
+            jobs = [(f, u) for f, u in jobs if f not in existing]
+
+            with _make_progress(console) as progress:
                 task_id = progress.add_task(
                     f"Downloading {len(items)} items...", total=len(items)
                 )
-                tasks = [
-                    process_iiif_canvas(
-                        client, canvas, i + 1, settings, target_dir, progress, task_id
-                    )
-                    for i, canvas in enumerate(items)
-                ]
-                await asyncio.gather(*tasks)
+                progress.update(task_id, advance=len(items) - len(jobs))
+                canvas_sem = asyncio.Semaphore(settings.canvas_concurrency)
+
+                async def bounded_canvas(filename: str, url: str) -> None:
+                    """Download a canvas once a canvas slot is free."""
+                    async with canvas_sem:
+                        await download_canvas(
+                            client,
+                            filename,
+                            url,
+                            target_dir,
+                            progress,
+                            task_id,
+                            request_sem,
+                            existing,
+                        )
+
+                await asyncio.gather(*(bounded_canvas(f, u) for f, u in jobs))
         else:
             log.info("legacy_mode_detected")
             manuscript_id = input_str
             start, end = (settings.rangebegin, settings.rangeend)
             if range_str:
-                try:
-                    start, end = map(int, range_str.split("-"))
-                except ValueError:
-                    log.error("invalid_range_format", range=range_str)
-                    raise ValueError(
-                        f"Invalid range format: {range_str}. Use start-end (e.g., 1-10)"
-                    ) from None
+                start, end = _parse_range(range_str)
 
             target_dir = settings.basedir / manuscript_id
             target_dir.mkdir(parents=True, exist_ok=True)
+            existing = set(os.listdir(target_dir))
+
+            await _warm_up(client, settings.baseurl)
 
             pages = []
             for i in range(start, end + 1):
                 pages.append((i, "r"))
                 pages.append((i, "v"))
 
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                BarColumn(),
-                TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                console=console,
-            ) as progress:
+            with _make_progress(console) as progress:
                 task_id = progress.add_task(
                     f"Downloading {len(pages)} pages...", total=len(pages)
                 )
-                # Legacy mode uses smaller batches to avoid overwhelming the server
-                chunk_size = 5
-                for i in range(0, len(pages), chunk_size):
-                    chunk = pages[i : i + chunk_size]
-                    batch_tasks = [
-                        process_legacy_page(
+                page_sem = asyncio.Semaphore(settings.page_concurrency)
+
+                async def bounded_page(page_num: int, side: str) -> None:
+                    """Process a page once a page slot is free."""
+                    async with page_sem:
+                        await process_legacy_page(
                             client,
                             manuscript_id,
-                            p,
-                            s,
+                            page_num,
+                            side,
                             settings,
                             target_dir,
                             progress,
                             task_id,
+                            request_sem,
+                            existing,
                         )
-                        for p, s in chunk
-                    ]
-                    await asyncio.gather(*batch_tasks)
+
+                await asyncio.gather(*(bounded_page(p, s) for p, s in pages))
 
     log.info("download_complete")
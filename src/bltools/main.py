@@ -1,13 +1,12 @@
 import asyncio
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 import structlog
 import typer
 from rich.console import Console
 
-from bltools.core import download_manuscript
-from bltools.settings import get_settings
+from bltools.settings import OutputFormat, get_settings
 
 app = typer.Typer(
     help="British Library Manuscript Downloader",
@@ -16,6 +15,8 @@ app = typer.Typer(
 console = Console()
 
 
+# Keeps ``download`` a named subcommand; with a single command and no callback,
+# Typer would promote it to the root command.
 @app.callback()
 def main() -> None:
     """British Library Manuscript Downloader CLI."""
@@ -33,6 +34,11 @@ def download(
     range: Optional[str] = typer.Option(
         None, "--range", help="Page range to download (e.g., 1-10)"
     ),
+    output_format: Optional[OutputFormat] = typer.Option(
+        None,
+        "--format",
+        help="Save legacy pages as stitched JPEGs or as directories of raw tiles",
+    ),
     verbose: bool = typer.Option(False, "--verbose", help="Enable debug logging"),
 ) -> None:
     """
@@ -45,15 +51,26 @@ def download(
         input_str: Manuscript ID or IIIF Manifest URL.
         output: Optional override for the output directory.
         range: Optional page range (e.g., 1-10).
+        output_format: Optional override for how legacy pages are saved.
         verbose: Enable debug-level logging.
     """
+    # Deferred so that --help and argument errors skip the HTTP/imaging stack.
+    from bltools.core import download_manuscript  # noqa: PLC0415
+
     settings = get_settings()
 
     if verbose:
         structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(20))
 
+    overrides: dict[str, Any] = {}
     if output:
-        settings.basedir = output
+        overrides["basedir"] = output
+
+    if output_format:
+        overrides["output_format"] = output_format
+
+    if overrides:
+        settings = settings.model_copy(update=overrides)
 
     try:
         asyncio.run(download_manuscript(input_str, settings, console, range))
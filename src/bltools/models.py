@@ -1,6 +1,11 @@
+import re
 from typing import Any, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+
+# Full-size image request for each Image API version; v3 dropped "full" as a size.
+IMAGE_URL_SUFFIX_V2 = "/full/full/0/default.jpg"
+IMAGE_URL_SUFFIX_V3 = "/full/max/0/default.jpg"
 
 
 class IIIFService(BaseModel):
@@ -10,18 +15,37 @@ class IIIFService(BaseModel):
     id_v3: Optional[str] = Field(None, alias="id")
     type: Optional[str] = Field(None, alias="@type")
     type_v3: Optional[str] = Field(None, alias="type")
-    profile: str
+
+    _service_id: str = PrivateAttr("")
+    _is_v3: bool = PrivateAttr(False)
+    _image_url: str = PrivateAttr("")
+
+    @model_validator(mode="after")
+    def _resolve(self) -> "IIIFService":
+        """Resolve the base URL, API version and image URL once, at validation time."""
+        self._service_id = self.id_v3 or self.id or ""
+        t = (self.type_v3 or self.type or "").lower()
+        self._is_v3 = "3" in t or "/3/" in self._service_id
+        base_url = self._service_id.rstrip("/")
+        if base_url:
+            suffix = IMAGE_URL_SUFFIX_V3 if self._is_v3 else IMAGE_URL_SUFFIX_V2
+            self._image_url = base_url + suffix
+        return self
 
     @property
     def service_id(self) -> str:
         """Get the base URL for the image service."""
-        return self.id_v3 or self.id or ""
+        return self._service_id
 
     @property
     def is_v3(self) -> bool:
         """Determine if this is a IIIF Image API v3 service."""
-        t = (self.type_v3 or self.type or "").lower()
-        return "3" in t or "/3/" in (self.service_id or "")
+        return self._is_v3
+
+    @property
+    def image_url(self) -> str:
+        """Get the full-size image URL, or an empty string if the service has no id."""
+        return self._image_url
 
 
 class IIIFImageBody(BaseModel):
@@ -29,9 +53,6 @@ class IIIFImageBody(BaseModel):
 
     id: str
     type: str
-    format: str
-    width: int
-    height: int
     service: list[IIIFService]
 
 
@@ -40,7 +61,6 @@ class IIIFAnnotation(BaseModel):
 
     id: str
     type: str
-    motivation: str
     body: IIIFImageBody
 
 
@@ -58,21 +78,33 @@ class IIIFCanvas(BaseModel):
     id: str
     type: str
     label: Union[str, dict[str, Any]]
-    width: int
-    height: int
     items: list[IIIFAnnotationPage]
 
+    _filename_label: str = PrivateAttr("")
+
+    @model_validator(mode="after")
+    def _sanitize_label(self) -> "IIIFCanvas":
+        """Reduce the label to a filesystem-safe string once, at validation time."""
+        label: Any = self.label
+        if isinstance(label, dict):
+            values = label.get("en") or next(iter(label.values()), None)
+            label = values[0] if isinstance(values, list) and values else values
+        self._filename_label = re.sub(r"[^\w\-]+", "_", str(label or ""))[:80]
+        return self
+
+    @property
+    def filename_label(self) -> str:
+        """Get the label as a filename fragment, or an empty string if there is none."""
+        return self._filename_label
+
     def get_image_url(self) -> str:
         """Construct the maximum resolution IIIF Image URL."""
-        try:
-            body = self.items[0].items[0].body
-            service = body.service[0]
-            base_url = service.service_id.rstrip("/")
-            if service.is_v3:
-                return f"{base_url}/full/max/0/default.jpg"
-            return f"{base_url}/full/full/0/default.jpg"
-        except (IndexError, AttributeError):
+        if not self.items or not self.items[0].items:
+            return ""
+        service_list = self.items[0].items[0].body.service
+        if not service_list:
             return ""
+        return service_list[0].image_url
 
 
 class IIIFManifest(BaseModel):
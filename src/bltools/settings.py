@@ -1,9 +1,19 @@
-from pathlib import Path
+from enum import Enum
 from functools import lru_cache
+from pathlib import Path
+from typing import Literal
 
+from pydantic import PositiveInt
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class OutputFormat(str, Enum):
+    """How legacy tiled pages are saved."""
+
+    JPEG = "jpeg"
+    TILES = "tiles"
+
+
 class Settings(BaseSettings):
     """
     Application settings.
@@ -15,6 +25,11 @@ class Settings(BaseSettings):
     rangebegin: int = 1
     rangeend: int = 259
     baseurl: str = "http://www.bl.uk/manuscripts/Proxy.ashx?view="
+    page_concurrency: PositiveInt = 20
+    max_concurrency: PositiveInt = 32
+    canvas_concurrency: PositiveInt = 16
+    stitcher: Literal["pillow", "vips"] = "pillow"
+    output_format: OutputFormat = OutputFormat.JPEG
 
     model_config = SettingsConfigDict(
         env_prefix="BLTOOLS_",
@@ -24,5 +39,11 @@ class Settings(BaseSettings):
     )
 
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
+    """
+    Return the process-wide settings, reading the environment and .env once.
+
+    The instance is shared, so callers must not mutate it; use ``model_copy``.
+    """
     return Settings()
@@ -1,22 +1,28 @@
+import asyncio
+import gc
 import io
 
 import httpx
+import numpy as np
 import pytest
 from PIL import Image
 from rich.console import Console
 from rich.progress import Progress
 
+from bltools import core
 from bltools.core import (
     IIIFCanvas,
     IIIFManifest,
     download_image,
+    download_image_to_file,
     download_manuscript,
     fetch_manifest,
     get_file_info,
     process_iiif_canvas,
     process_legacy_page,
 )
-from bltools.settings import Settings
+from bltools.models import IIIFService
+from bltools.settings import OutputFormat, Settings
 
 
 @pytest.mark.asyncio
@@ -98,6 +104,23 @@ async def test_get_file_info_legacy(respx_mock):
     assert t == 256
 
 
+@pytest.mark.asyncio
+async def test_get_file_info_waits_for_request_slot(respx_mock):
+    settings = Settings(baseurl="http://test.com/")
+    route = respx_mock.get(url__regex=r".*\.xml").mock(
+        return_value=httpx.Response(200, content=b"")
+    )
+    sem = asyncio.Semaphore(1)
+
+    async with sem, httpx.AsyncClient() as client:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                get_file_info(client, "ms1", "f001r.jpg", settings, sem), 0.05
+            )
+
+    assert route.call_count == 0
+
+
 @pytest.mark.asyncio
 async def test_download_image_retry(respx_mock):
     url = "http://test.com/img.jpg"
@@ -115,6 +138,24 @@ async def test_download_image_retry(respx_mock):
     assert route.call_count == 2
 
 
+@pytest.mark.asyncio
+async def test_download_image_to_file(respx_mock, tmp_path):
+    url = "http://test.com/img.jpg"
+    respx_mock.get(url).mock(
+        side_effect=[
+            httpx.Response(500),
+            httpx.Response(200, content=b"fake_image"),
+        ]
+    )
+    target_file = tmp_path / "img.jpg"
+
+    async with httpx.AsyncClient() as client:
+        await download_image_to_file(client, url, target_file)
+
+    assert target_file.read_bytes() == b"fake_image"
+    assert list(tmp_path.iterdir()) == [target_file]
+
+
 @pytest.mark.asyncio
 async def test_download_manuscript_iiif(respx_mock, tmp_path):
     manifest_url = "http://test.com/manifest"
@@ -176,6 +217,74 @@ async def test_download_manuscript_iiif(respx_mock, tmp_path):
     assert target_file.read_bytes() == b"img_content"
 
 
+@pytest.mark.asyncio
+async def test_download_manuscript_iiif_range(respx_mock, tmp_path):
+    manifest_url = "http://test.com/manifest"
+    settings = Settings(basedir=tmp_path)
+    console = Console(quiet=True)
+
+    def canvas(n):
+        return {
+            "id": f"c{n}",
+            "type": "Canvas",
+            "label": f"Page {n}",
+            "width": 10,
+            "height": 10,
+            "items": [
+                {
+                    "id": f"p{n}",
+                    "type": "AnnotationPage",
+                    "items": [
+                        {
+                            "id": f"a{n}",
+                            "type": "Annotation",
+                            "motivation": "painting",
+                            "body": {
+                                "id": f"i{n}",
+                                "type": "Image",
+                                "format": "image/jpeg",
+                                "width": 10,
+                                "height": 10,
+                                "service": [
+                                    {
+                                        "id": f"http://test.com/svc{n}",
+                                        "type": "ImageService2",
+                                        "profile": "level2",
+                                    }
+                                ],
+                            },
+                        }
+                    ],
+                }
+            ],
+        }
+
+    manifest_data = {
+        "id": manifest_url,
+        "type": "Manifest",
+        "label": "Test",
+        "items": [canvas(1), canvas(2), canvas(3)],
+    }
+    respx_mock.get(manifest_url).mock(
+        return_value=httpx.Response(200, json=manifest_data)
+    )
+    route = respx_mock.get("http://test.com/svc3/full/full/0/default.jpg").mock(
+        return_value=httpx.Response(200, content=b"img_content")
+    )
+    target_dir = tmp_path / "manifest"
+    target_dir.mkdir()
+    (target_dir / "0002_Page_2.jpg").write_bytes(b"saved")
+
+    await download_manuscript(manifest_url, settings, console, range_str="2-3")
+
+    assert sorted(p.name for p in target_dir.iterdir()) == [
+        "0002_Page_2.jpg",
+        "0003_Page_3.jpg",
+    ]
+    assert (target_dir / "0002_Page_2.jpg").read_bytes() == b"saved"
+    assert route.call_count == 1
+
+
 @pytest.mark.asyncio
 async def test_download_manuscript_legacy(respx_mock, tmp_path):
     ms_id = "ms1"
@@ -202,6 +311,328 @@ async def test_download_manuscript_legacy(respx_mock, tmp_path):
     assert (tmp_path / ms_id / "f001v.jpg").exists()
 
 
+@pytest.mark.asyncio
+async def test_download_manuscript_legacy_vips(respx_mock, tmp_path):
+    pytest.importorskip("pyvips")
+    ms_id = "ms1"
+    settings = Settings(basedir=tmp_path, baseurl="http://test.com/", stitcher="vips")
+    console = Console(quiet=True)
+
+    xml = '<Image TileSize="10"><Size Width="20" Height="20"/></Image>'
+    respx_mock.get(url__regex=r".*\.xml").mock(
+        return_value=httpx.Response(200, content=xml)
+    )
+
+    img = Image.new("RGB", (10, 10), color="blue")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="JPEG")
+    respx_mock.get(url__regex=r".*_files/.*").mock(
+        return_value=httpx.Response(200, content=img_bytes.getvalue())
+    )
+
+    await download_manuscript(ms_id, settings, console, range_str="1-1")
+
+    with Image.open(tmp_path / ms_id / "f001r.jpg") as page:
+        assert page.size == (19, 19)
+
+
+@pytest.mark.asyncio
+async def test_download_manuscript_legacy_vips_bad_tile(respx_mock, tmp_path):
+    pytest.importorskip("pyvips")
+    ms_id = "ms1"
+    settings = Settings(basedir=tmp_path, baseurl="http://test.com/", stitcher="vips")
+    console = Console(quiet=True)
+
+    xml = '<Image TileSize="10"><Size Width="20" Height="10"/></Image>'
+    respx_mock.get(url__regex=r".*\.xml").mock(
+        return_value=httpx.Response(200, content=xml)
+    )
+    img = Image.new("RGB", (10, 10), color="blue")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="JPEG")
+    respx_mock.get(url__regex=r".*f001r_files/13/1_0\.jpg").mock(
+        return_value=httpx.Response(200, content=b"<html>Proxy error</html>")
+    )
+    respx_mock.get(url__regex=r".*_files/.*").mock(
+        return_value=httpx.Response(200, content=img_bytes.getvalue())
+    )
+
+    # Only the page with the bad tile is skipped; the run itself carries on.
+    await download_manuscript(ms_id, settings, console, range_str="1-1")
+
+    target_dir = tmp_path / ms_id
+    assert sorted(p.name for p in target_dir.iterdir()) == ["f001v.jpg"]
+
+
+@pytest.mark.asyncio
+async def test_download_manuscript_legacy_tiles(respx_mock, tmp_path):
+    ms_id = "ms1"
+    settings = Settings(
+        basedir=tmp_path, baseurl="http://test.com/", output_format=OutputFormat.TILES
+    )
+    console = Console(quiet=True)
+
+    xml = '<Image TileSize="10"><Size Width="20" Height="10"/></Image>'
+    respx_mock.get(url__regex=r".*\.xml").mock(
+        return_value=httpx.Response(200, content=xml)
+    )
+    respx_mock.get(url__regex=r".*_files/.*").mock(
+        return_value=httpx.Response(200, content=b"tile")
+    )
+
+    await download_manuscript(ms_id, settings, console, range_str="1-1")
+
+    page_dir = tmp_path / ms_id / "f001r"
+    assert sorted(p.name for p in page_dir.iterdir()) == ["0_0.jpg", "1_0.jpg"]
+    assert (page_dir / "1_0.jpg").read_bytes() == b"tile"
+    assert not (tmp_path / ms_id / "f001r.jpg").exists()
+    assert not (tmp_path / ms_id / ".cache").exists()
+
+
+@pytest.mark.asyncio
+async def test_process_legacy_page_tiles_keeps_no_tile_bytes(
+    respx_mock, tmp_path, monkeypatch
+):
+    target_dir = tmp_path / "ms1"
+    tile_cache = target_dir / ".cache" / "f001r"
+    tile_cache.mkdir(parents=True)
+    (tile_cache / "0_0.jpg").write_bytes(b"cached")
+    settings = Settings(baseurl="http://test.com/", output_format=OutputFormat.TILES)
+
+    xml = '<Image TileSize="10"><Size Width="20" Height="10"/></Image>'
+    respx_mock.get(url__regex=r".*\.xml").mock(
+        return_value=httpx.Response(200, content=xml)
+    )
+    respx_mock.get(url__regex=r".*_files/13/1_0\.jpg").mock(
+        return_value=httpx.Response(200, content=b"fetched")
+    )
+
+    collect_tiles = core._collect_tiles
+    collected = []
+
+    async def spy_collect_tiles(*args):
+        tiles = await collect_tiles(*args)
+        collected.append(tiles)
+        return tiles
+
+    monkeypatch.setattr(core, "_collect_tiles", spy_collect_tiles)
+
+    console = Console(quiet=True)
+    with Progress(console=console) as progress:
+        task_id = progress.add_task("test")
+        async with httpx.AsyncClient() as client:
+            await process_legacy_page(
+                client, "ms1", 1, "r", settings, target_dir, progress, task_id
+            )
+
+    assert collected == [{(0, 0): b"", (1, 0): b""}]
+    page_dir = target_dir / "f001r"
+    assert (page_dir / "0_0.jpg").read_bytes() == b"cached"
+    assert (page_dir / "1_0.jpg").read_bytes() == b"fetched"
+
+
+@pytest.mark.asyncio
+async def test_process_legacy_page_failed_tile(respx_mock, tmp_path, monkeypatch):
+    monkeypatch.setattr(core, "MAX_ATTEMPTS", 1)
+    target_dir = tmp_path / "ms1"
+    target_dir.mkdir()
+    settings = Settings(baseurl="http://test.com/")
+
+    xml = '<Image TileSize="10"><Size Width="20" Height="10"/></Image>'
+    respx_mock.get(url__regex=r".*\.xml").mock(
+        return_value=httpx.Response(200, content=xml)
+    )
+    img = Image.new("RGB", (10, 10), color="blue")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="JPEG")
+    respx_mock.get(url__regex=r".*_files/13/0_0\.jpg").mock(
+        return_value=httpx.Response(200, content=img_bytes.getvalue())
+    )
+    respx_mock.get(url__regex=r".*_files/13/1_0\.jpg").mock(
+        return_value=httpx.Response(404)
+    )
+
+    console = Console(quiet=True)
+    with Progress(console=console) as progress:
+        task_id = progress.add_task("test")
+        async with httpx.AsyncClient() as client:
+            await process_legacy_page(
+                client, "ms1", 1, "r", settings, target_dir, progress, task_id
+            )
+
+    assert not (target_dir / "f001r.jpg").exists()
+
+
+@pytest.mark.asyncio
+async def test_process_legacy_page_retrieves_every_tile_error(
+    respx_mock, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(core, "MAX_ATTEMPTS", 1)
+    target_dir = tmp_path / "ms1"
+    target_dir.mkdir()
+    settings = Settings(baseurl="http://test.com/")
+
+    xml = '<Image TileSize="10"><Size Width="40" Height="40"/></Image>'
+    respx_mock.get(url__regex=r".*\.xml").mock(
+        return_value=httpx.Response(200, content=xml)
+    )
+    respx_mock.get(url__regex=r".*_files/.*").mock(return_value=httpx.Response(404))
+
+    unretrieved = []
+    loop = asyncio.get_running_loop()
+    loop.set_exception_handler(lambda _loop, context: unretrieved.append(context))
+    try:
+        console = Console(quiet=True)
+        with Progress(console=console) as progress:
+            task_id = progress.add_task("test")
+            async with httpx.AsyncClient() as client:
+                await process_legacy_page(
+                    client, "ms1", 1, "r", settings, target_dir, progress, task_id
+                )
+        gc.collect()
+    finally:
+        loop.set_exception_handler(None)
+
+    assert not (target_dir / "f001r.jpg").exists()
+    assert unretrieved == []
+
+
+@pytest.mark.asyncio
+async def test_process_legacy_page_reuses_cached_tiles(respx_mock, tmp_path):
+    target_dir = tmp_path / "ms1"
+    tile_cache = target_dir / ".cache" / "f001r"
+    tile_cache.mkdir(parents=True)
+    settings = Settings(baseurl="http://test.com/")
+
+    xml = '<Image TileSize="10"><Size Width="20" Height="10"/></Image>'
+    respx_mock.get(url__regex=r".*\.xml").mock(
+        return_value=httpx.Response(200, content=xml)
+    )
+    img = Image.new("RGB", (10, 10), color="blue")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="JPEG")
+    (tile_cache / "0_0.jpg").write_bytes(img_bytes.getvalue())
+    missing = respx_mock.get(url__regex=r".*_files/13/1_0\.jpg").mock(
+        return_value=httpx.Response(200, content=img_bytes.getvalue())
+    )
+
+    console = Console(quiet=True)
+    with Progress(console=console) as progress:
+        task_id = progress.add_task("test")
+        async with httpx.AsyncClient() as client:
+            await process_legacy_page(
+                client, "ms1", 1, "r", settings, target_dir, progress, task_id
+            )
+
+    assert (target_dir / "f001r.jpg").exists()
+    assert missing.call_count == 1
+    assert not tile_cache.parent.exists()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("output_format", list(OutputFormat))
+async def test_process_legacy_page_survives_cache_write_error(
+    respx_mock, tmp_path, monkeypatch, output_format
+):
+    target_dir = tmp_path / "ms1"
+    target_dir.mkdir()
+    settings = Settings(baseurl="http://test.com/", output_format=output_format)
+
+    cache_tile = core._cache_tile
+    failed = []
+
+    def flaky_cache_tile(cache_path, content):
+        if cache_path.name == "1_0.jpg" and not failed:
+            failed.append(cache_path)
+            raise OSError(28, "No space left on device")
+        cache_tile(cache_path, content)
+
+    monkeypatch.setattr(core, "_cache_tile", flaky_cache_tile)
+
+    xml = '<Image TileSize="10"><Size Width="20" Height="10"/></Image>'
+    respx_mock.get(url__regex=r".*\.xml").mock(
+        return_value=httpx.Response(200, content=xml)
+    )
+    img = Image.new("RGB", (10, 10), color="blue")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="JPEG")
+    respx_mock.get(url__regex=r".*_files/.*").mock(
+        return_value=httpx.Response(200, content=img_bytes.getvalue())
+    )
+
+    console = Console(quiet=True)
+    with Progress(console=console) as progress:
+        task_id = progress.add_task("test")
+        async with httpx.AsyncClient() as client:
+            await process_legacy_page(
+                client, "ms1", 1, "r", settings, target_dir, progress, task_id
+            )
+
+    assert failed
+    if output_format == OutputFormat.TILES:
+        page_dir = target_dir / "f001r"
+        assert sorted(p.name for p in page_dir.iterdir()) == ["0_0.jpg", "1_0.jpg"]
+    else:
+        assert (target_dir / "f001r.jpg").exists()
+
+
+@pytest.mark.asyncio
+async def test_process_legacy_page_drops_corrupt_cached_tile(respx_mock, tmp_path):
+    target_dir = tmp_path / "ms1"
+    tile_cache = target_dir / ".cache" / "f001r"
+    tile_cache.mkdir(parents=True)
+    (tile_cache / "1_0.jpg").write_bytes(b"<html>Proxy error</html>")
+    settings = Settings(baseurl="http://test.com/")
+
+    xml = '<Image TileSize="10"><Size Width="20" Height="10"/></Image>'
+    respx_mock.get(url__regex=r".*\.xml").mock(
+        return_value=httpx.Response(200, content=xml)
+    )
+    img = Image.new("RGB", (10, 10), color="blue")
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format="JPEG")
+    respx_mock.get(url__regex=r".*_files/.*").mock(
+        return_value=httpx.Response(200, content=img_bytes.getvalue())
+    )
+
+    console = Console(quiet=True)
+    with Progress(console=console) as progress:
+        task_id = progress.add_task("test")
+        async with httpx.AsyncClient() as client:
+            # The first run fails on the cached tile and must not keep it.
+            await process_legacy_page(
+                client, "ms1", 1, "r", settings, target_dir, progress, task_id
+            )
+            assert not (target_dir / "f001r.jpg").exists()
+            assert not tile_cache.exists()
+
+            await process_legacy_page(
+                client, "ms1", 1, "r", settings, target_dir, progress, task_id
+            )
+
+    assert (target_dir / "f001r.jpg").exists()
+
+
+@pytest.mark.parametrize("use_simplejpeg", [True, False])
+def test_paste_tile_offsets_and_clips(monkeypatch, use_simplejpeg):
+    if not use_simplejpeg:
+        monkeypatch.setattr(core, "simplejpeg", None)
+    elif core.simplejpeg is None:
+        pytest.skip("simplejpeg not installed")
+
+    tile = io.BytesIO()
+    Image.new("RGB", (10, 10), color=(255, 0, 0)).save(tile, format="JPEG")
+    canvas = np.zeros((15, 15, 3), dtype=np.uint8)
+
+    # The tile overhangs the right edge and must be clipped to 5 columns.
+    core._paste_tile(canvas, tile.getvalue(), 10, 0)
+
+    assert (canvas[:10, 10:, 0] > 200).all()
+    assert (canvas[:10, 10:, 1:] < 50).all()
+    assert not canvas[:, :10].any()
+    assert not canvas[10:].any()
+
+
 @pytest.mark.asyncio
 async def test_process_legacy_page_skip(respx_mock, tmp_path):
     target_dir = tmp_path / "ms1"
@@ -220,6 +651,27 @@ async def test_process_legacy_page_skip(respx_mock, tmp_path):
     assert len(respx_mock.calls) == 0
 
 
+@pytest.mark.asyncio
+async def test_process_legacy_page_info_error(respx_mock, tmp_path):
+    target_dir = tmp_path / "ms1"
+    target_dir.mkdir()
+    settings = Settings(baseurl="http://test.com/")
+    respx_mock.get(url__regex=r".*\.xml").mock(return_value=httpx.Response(404))
+    respx_mock.get(url__regex=r".*_files/.*").mock(
+        return_value=httpx.Response(200, content=b"tile")
+    )
+
+    console = Console(quiet=True)
+    with Progress(console=console) as progress:
+        task_id = progress.add_task("test")
+        async with httpx.AsyncClient() as client:
+            await process_legacy_page(
+                client, "ms1", 1, "r", settings, target_dir, progress, task_id
+            )
+
+    assert not (target_dir / "f001r.jpg").exists()
+
+
 @pytest.mark.asyncio
 async def test_get_file_info_error(respx_mock):
     settings = Settings(baseurl="http://test.com/")
@@ -244,21 +696,46 @@ async def test_get_file_info_malformed(respx_mock):
 
 @pytest.mark.asyncio
 async def test_iiif_canvas_no_url():
-    canvas = IIIFCanvas(
-        id="c1", type="Canvas", label="Test", width=100, height=100, items=[]
-    )
+    canvas = IIIFCanvas(id="c1", type="Canvas", label="Test", items=[])
     assert canvas.get_image_url() == ""
 
 
+def test_iiif_service_resolved_at_validation():
+    v2 = IIIFService.model_validate(
+        {"@id": "https://x/iiif/2/p1/", "@type": "ImageService2", "profile": "level2"}
+    )
+    v3 = IIIFService.model_validate(
+        {"id": "https://x/iiif/3/p1", "type": "ImageService3", "profile": "level2"}
+    )
+    assert (v2.service_id, v2.is_v3) == ("https://x/iiif/2/p1/", False)
+    assert (v3.service_id, v3.is_v3) == ("https://x/iiif/3/p1", True)
+    assert v2.image_url == "https://x/iiif/2/p1/full/full/0/default.jpg"
+    assert v3.image_url == "https://x/iiif/3/p1/full/max/0/default.jpg"
+
+
+@pytest.mark.parametrize(
+    ("label", "expected"),
+    [
+        ("Page 1", "Page_1"),
+        ("f. 1r/1v", "f_1r_1v"),
+        ({"en": ["Folio 2"], "fr": ["Feuillet 2"]}, "Folio_2"),
+        ({"fr": ["Feuillet 2"]}, "Feuillet_2"),
+        ({}, ""),
+    ],
+)
+def test_iiif_canvas_filename_label(label, expected):
+    canvas = IIIFCanvas(id="c1", type="Canvas", label=label, items=[])
+    assert canvas.filename_label == expected
+    assert core._canvas_filename(canvas, 3) == f"0003_{expected or 3}.jpg"
+
+
 @pytest.mark.asyncio
 async def test_process_iiif_canvas_skip_existing(tmp_path):
     target_dir = tmp_path / "ms1"
     target_dir.mkdir()
     (target_dir / "0001_Test.jpg").touch()
 
-    canvas = IIIFCanvas(
-        id="c1", type="Canvas", label="Test", width=10, height=10, items=[]
-    )
+    canvas = IIIFCanvas(id="c1", type="Canvas", label="Test", items=[])
     settings = Settings()
     console = Console(quiet=True)
 
@@ -273,12 +750,75 @@ async def test_process_iiif_canvas_skip_existing(tmp_path):
 
 
 @pytest.mark.asyncio
-async def test_process_iiif_canvas_no_url(tmp_path):
-    canvas = IIIFCanvas(
-        id="c1", type="Canvas", label="Test", width=10, height=10, items=[]
+async def test_process_iiif_canvas_uses_existing_listing(respx_mock, tmp_path):
+    canvas = IIIFCanvas.model_validate(
+        {
+            "id": "c1",
+            "type": "Canvas",
+            "label": "Test",
+            "items": [
+                {
+                    "id": "p1",
+                    "type": "AnnotationPage",
+                    "items": [
+                        {
+                            "id": "a1",
+                            "type": "Annotation",
+                            "body": {
+                                "id": "i1",
+                                "type": "Image",
+                                "service": [{"id": "http://test.com/svc"}],
+                            },
+                        }
+                    ],
+                }
+            ],
+        }
+    )
+    route = respx_mock.get("http://test.com/svc/full/full/0/default.jpg").mock(
+        return_value=httpx.Response(200, content=b"img")
     )
     target_dir = tmp_path / "ms1"
     target_dir.mkdir()
+    console = Console(quiet=True)
+
+    with Progress(console=console) as progress:
+        task_id = progress.add_task("test")
+        async with httpx.AsyncClient() as client:
+            # Listed as saved, so it is skipped without touching the disk.
+            await process_iiif_canvas(
+                client,
+                canvas,
+                1,
+                Settings(),
+                target_dir,
+                progress,
+                task_id,
+                existing={"0001_Test.jpg"},
+            )
+            assert route.call_count == 0
+
+            existing: set[str] = set()
+            await process_iiif_canvas(
+                client,
+                canvas,
+                1,
+                Settings(),
+                target_dir,
+                progress,
+                task_id,
+                existing=existing,
+            )
+
+    assert existing == {"0001_Test.jpg"}
+    assert (target_dir / "0001_Test.jpg").read_bytes() == b"img"
+
+
+@pytest.mark.asyncio
+async def test_process_iiif_canvas_no_url(tmp_path):
+    canvas = IIIFCanvas(id="c1", type="Canvas", label="Test", items=[])
+    target_dir = tmp_path / "ms1"
+    target_dir.mkdir()
     settings = Settings()
     console = Console(quiet=True)
 
@@ -346,3 +886,4 @@ async def test_process_iiif_canvas_download_error(respx_mock, tmp_path):
             )
 
     assert not (target_dir / "0001_Test.jpg").exists()
+    assert not (target_dir / "0001_Test.jpg.part").exists()
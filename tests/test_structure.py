@@ -1,7 +1,9 @@
+import pytest
+from pydantic import ValidationError
 from typer.testing import CliRunner
 
 from bltools.main import app
-from bltools.settings import Settings
+from bltools.settings import Settings, get_settings
 
 runner = CliRunner()
 
@@ -12,6 +14,20 @@ def test_config_defaults():
     assert settings.baseurl.startswith("http")
 
 
+@pytest.mark.parametrize(
+    "field", ["page_concurrency", "max_concurrency", "canvas_concurrency"]
+)
+@pytest.mark.parametrize("value", ["0", "-1"])
+def test_concurrency_must_be_positive(monkeypatch, field, value):
+    monkeypatch.setenv(f"BLTOOLS_{field.upper()}", value)
+    with pytest.raises(ValidationError):
+        Settings()
+
+
+def test_get_settings_cached():
+    assert get_settings() is get_settings()
+
+
 def test_help():
     result = runner.invoke(app, ["--help"])
     assert result.exit_code == 0, (